@@ -1,13 +1,48 @@
 import os
 import json
 import csv
+import argparse
+import inspect
 import datetime
+import difflib
+import hashlib
+import bisect
+import heapq
+import itertools
+import operator
+import re
+import shlex
+import subprocess
+import threading
+import time
 import pandas as pd
 
 NOTES_FILE = 'notes.json'
 TASKS_FILE = 'tasks.json'
 CONTACTS_FILE = 'contacts.json'
 FINANCE_FILE = 'finance.json'
+NOTES_HISTORY_FILE = 'notes_history.jsonl'
+NOTES_HISTORY_INDEX_FILE = 'notes_history_index.json'
+CHANGE_SEQUENCE_FILE = 'change_sequence.json'
+NOTES_TOMBSTONES_FILE = 'notes_tombstones.json'
+TASKS_TOMBSTONES_FILE = 'tasks_tombstones.json'
+CONTACTS_TOMBSTONES_FILE = 'contacts_tombstones.json'
+FINANCE_TOMBSTONES_FILE = 'finance_tombstones.json'
+
+# Каждая N-я ревизия заметки хранится целиком, остальные - как дельта к предыдущей
+HISTORY_KEYFRAME_INTERVAL = 10
+# Сколько последних ревизий заметки остается после очистки истории
+HISTORY_MAX_REVISIONS = 50
+# Сколько байт с начала и с конца проиндексированной части файла истории входит в его отпечаток
+HISTORY_FINGERPRINT_BYTES = 4096
+# Количество объектов на одной странице при выводе списков
+PAGE_SIZE = 20
+# Время суток, в которое срабатывает напоминание о задаче в день срока
+REMINDER_TIME = datetime.time(9, 0)
+# Внешняя команда для напоминаний, получает ID, заголовок и срок задачи аргументами
+REMINDER_HOOK = os.environ.get('ASSISTANT_REMINDER_HOOK')
+# Сколько строк записывается в одну группу строк Parquet и читается за один раз при импорте
+PARQUET_BATCH_SIZE = 65536
 
 def save_data(file_path, data):
     with open(file_path, 'w', encoding='utf-8') as file:
@@ -27,41 +62,480 @@ def is_valid_date(date_str):
     except ValueError:
         return False
 
+def parse_date(date_str):
+    try:
+        return datetime.datetime.strptime(date_str, '%d-%m-%Y').date()
+    except (TypeError, ValueError):
+        return None
+
+def format_date(value):
+    return value.strftime('%d-%m-%Y') if value else None
+
+def import_pyarrow():
+    # pyarrow нужен только для Parquet, без него остальные разделы продолжают работать
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError('Для работы с Parquet установите пакет pyarrow')
+    return pyarrow, pyarrow.parquet
+
+def export_to_parquet(file_name, columns, items):
+    # Записывает объекты пачками: каждая пачка становится отдельной группой строк файла
+    pa, pq = import_pyarrow()
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, (type_name, _) in columns.items()])
+    try:
+        with pq.ParquetWriter(file_name, schema, compression='zstd') as writer:
+            for start in range(0, len(items), PARQUET_BATCH_SIZE):
+                batch = items[start:start + PARQUET_BATCH_SIZE]
+                table = pa.Table.from_pydict(
+                    {name: [getter(item) for item in batch] for name, (_, getter) in columns.items()},
+                    schema=schema
+                )
+                writer.write_table(table)
+    except pa.ArrowException as e:
+        raise ValueError(str(e))
+
+def iter_parquet_rows(file_name, columns):
+    pa, pq = import_pyarrow()
+    try:
+        parquet_file = pq.ParquetFile(file_name)
+        missing = [name for name in columns if name not in parquet_file.schema_arrow.names]
+        if missing:
+            raise ValueError(f"В файле нет столбцов: {', '.join(missing)}")
+        for batch in parquet_file.iter_batches(batch_size=PARQUET_BATCH_SIZE, columns=list(columns)):
+            data = batch.to_pydict()
+            yield from zip(*(data[name] for name in columns))
+    except pa.ArrowException as e:
+        raise ValueError(str(e))
+
+def next_change_seq(count=1):
+    # Общий для всех разделов монотонный счетчик изменений; возвращает первый из count выделенных номеров
+    data = load_data(CHANGE_SEQUENCE_FILE, {'seq': 0})
+    first = data['seq'] + 1
+    data['seq'] += count
+    save_data(CHANGE_SEQUENCE_FILE, data)
+    return first
+
+def current_change_seq():
+    return load_data(CHANGE_SEQUENCE_FILE, {'seq': 0})['seq']
+
+def purged_change_seq(name):
+    # Отметка, до которой надгробия раздела уже удалены; выгрузка с более ранней отметки не увидит часть удалений
+    return load_data(CHANGE_SEQUENCE_FILE, {'seq': 0}).get('purged', {}).get(name, 0)
+
+class ChangeTracker:
+    def __init__(self, tombstones_file, id_attr):
+        self.tombstones_file = tombstones_file
+        self.id_attr = id_attr
+        self.tombstones = {}
+        # Объекты и надгробия удаленных объектов по ID в порядке возрастания номера изменения,
+        # поэтому изменения после отметки находятся обходом с конца
+        self.changes = {}
+
+    def load(self, items):
+        self.tombstones = {tombstone['id']: tombstone for tombstone in load_data(self.tombstones_file, [])}
+        self.changes = {}
+        entries = [(tombstone['change_seq'], key, tombstone) for key, tombstone in self.tombstones.items()]
+        entries += [(item.change_seq, getattr(item, self.id_attr), item) for item in items]
+        for _, key, value in sorted(entries, key=lambda entry: entry[0]):
+            self.changes.pop(key, None)
+            self.changes[key] = value
+        untracked = [item for item in items if not item.change_seq]
+        if untracked:
+            # Объекты, сохраненные до появления учета изменений, получают номера один раз
+            self.touch_many(untracked)
+        return bool(untracked)
+
+    def save_tombstones(self):
+        save_data(self.tombstones_file, list(self.tombstones.values()))
+
+    def touch(self, item):
+        self.touch_many([item])
+
+    def touch_many(self, items):
+        if not items:
+            return
+        seq = next_change_seq(len(items))
+        modified_at = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        revived = False
+        for item in items:
+            item.change_seq = seq
+            item.modified_at = modified_at
+            seq += 1
+            key = getattr(item, self.id_attr)
+            if self.tombstones.pop(key, None) is not None:
+                revived = True
+            self.changes.pop(key, None)
+            self.changes[key] = item
+        if revived:
+            self.save_tombstones()
+
+    def remove(self, key):
+        tombstone = {
+            'id': key,
+            'change_seq': next_change_seq(),
+            'deleted_at': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        self.tombstones[key] = tombstone
+        self.save_tombstones()
+        self.changes.pop(key, None)
+        self.changes[key] = tombstone
+
+    def purge_tombstones(self, before_seq):
+        # Надгробия нужны только потребителям, которые еще не выгрузили изменения до before_seq;
+        # без очистки каждое удаление переписывает и каждая загрузка разбирает все прошлые удаления
+        purged = [key for key, tombstone in self.tombstones.items() if tombstone['change_seq'] <= before_seq]
+        for key in purged:
+            del self.tombstones[key]
+            del self.changes[key]
+        if purged:
+            self.save_tombstones()
+        return len(purged)
+
+    def changes_since(self, watermark):
+        result = []
+        for value in reversed(self.changes.values()):
+            seq = value['change_seq'] if isinstance(value, dict) else value.change_seq
+            if seq <= watermark:
+                break
+            result.append(value)
+        result.reverse()
+        return result
+
+def date_sort_key(date_str):
+    # Пустые и некорректные даты при сортировке идут последними
+    try:
+        return (False, datetime.datetime.strptime(date_str, '%d-%m-%Y'))
+    except (TypeError, ValueError):
+        return (True, datetime.datetime.min)
+
+def resolve_sort_key(sort_keys, sort_by):
+    if sort_by is None:
+        return None
+    if sort_by not in sort_keys:
+        raise ValueError(f'Неизвестное поле сортировки: {sort_by}')
+    return sort_keys[sort_by]
+
+def iter_rows(items, predicate=None, sort_key=None, reverse=False, offset=0, limit=None, cursor=None):
+    # Выдает пары (курсор, объект). Без сортировки курсор - позиция в списке, и страница
+    # стоит O(offset + limit); с сортировкой курсор - пара (ключ, позиция), а для страницы
+    # достаточно кучи из offset + limit элементов вместо полной сортировки
+    if sort_key is None:
+        if reverse:
+            stop = len(items) if cursor is None else cursor
+            positions = range(stop - 1, -1, -1)
+        else:
+            positions = range(0 if cursor is None else cursor + 1, len(items))
+        rows = ((position, items[position]) for position in positions)
+        if predicate is not None:
+            rows = (row for row in rows if predicate(row[1]))
+    else:
+        rows = (
+            ((sort_key(item), position), item) for position, item in enumerate(items)
+            if predicate is None or predicate(item)
+        )
+        if cursor is not None:
+            cursor = tuple(cursor)
+            rows = (row for row in rows if (row[0] < cursor if reverse else row[0] > cursor))
+        if limit is None:
+            rows = iter(sorted(rows, key=lambda row: row[0], reverse=reverse))
+        else:
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            rows = iter(select(offset + limit, rows, key=lambda row: row[0]))
+    return itertools.islice(rows, offset, None if limit is None else offset + limit)
+
+def iter_query(items, predicate=None, sort_key=None, reverse=False, offset=0, limit=None, cursor=None):
+    return (item for _, item in iter_rows(items, predicate, sort_key, reverse, offset, limit, cursor))
+
+def fetch_page(items, limit=PAGE_SIZE, cursor=None, predicate=None, sort_key=None, reverse=False):
+    # Возвращает страницу и курсор следующей страницы (None, если страница последняя)
+    if limit < 1:
+        raise ValueError(f'Некорректный размер страницы: {limit}')
+    rows = list(iter_rows(items, predicate, sort_key, reverse, limit=limit + 1, cursor=cursor))
+    page = [item for _, item in rows[:limit]]
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return page, next_cursor
+
+def print_pages(items, render, page_size=PAGE_SIZE, header=None):
+    iterator = iter(items)
+    page = list(itertools.islice(iterator, page_size))
+    if not page:
+        return False
+    if header:
+        print(header)
+    while page:
+        for item in page:
+            print(render(item))
+        page = list(itertools.islice(iterator, page_size))
+        if page and input('Enter - следующая страница, q - выход: ').strip().lower() == 'q':
+            break
+    return True
+
+def ask_sort(sort_keys):
+    answer = input(f"Сортировка ({', '.join(sort_keys)}; '-' перед полем - по убыванию, Enter - без сортировки): ").strip()
+    reverse = answer.startswith('-')
+    sort_by = answer.lstrip('-') or None
+    if sort_by is not None and sort_by not in sort_keys:
+        print(f'Неизвестное поле сортировки: {sort_by}')
+        return None, False
+    return sort_by, reverse
+
 class Note:
-    def __init__(self, note_id, title, content, timestamp):
+    def __init__(self, note_id, title, content, timestamp, change_seq=0, modified_at=None):
         self.note_id = note_id
         self.title = title
         self.content = content
         self.timestamp = timestamp
+        self.change_seq = change_seq
+        self.modified_at = modified_at
+
+NOTE_SORT_KEYS = {
+    'id': lambda note: note.note_id,
+    'title': lambda note: note.title.lower(),
+    'date': lambda note: note.timestamp
+}
+
+def format_note(note):
+    return f'{note.note_id}. {note.title} (дата: {note.timestamp})'
+
+def make_delta(old_text, new_text):
+    # Дельта строится по строкам, а не по символам: посимвольное сравнение квадратично по длине заметки.
+    # Операция [начало, конец] копирует диапазон строк старого текста, строка вставляется как есть
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+def apply_delta(old_text, ops):
+    old_lines = old_text.splitlines(keepends=True)
+    return ''.join(''.join(old_lines[op[0]:op[1]]) if isinstance(op, list) else op for op in ops)
+
+class NoteHistory:
+    def __init__(self, file_path=NOTES_HISTORY_FILE, index_path=NOTES_HISTORY_INDEX_FILE):
+        self.file_path = file_path
+        self.index_path = index_path
+        self.revisions = None
+        self.offsets = {}
+        self.keyframes = {}
+        self.entry_count = 0
+
+    def load_index(self):
+        # В памяти держим только номера ревизий и смещения строк в файле, сами ревизии читаются по требованию
+        self.revisions = {}
+        self.offsets = {}
+        self.keyframes = {}
+        self.entry_count = 0
+        if not os.path.exists(self.file_path):
+            # Индекс от удаленного файла истории не должен подхватиться, когда файл появится заново
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            return
+        size = os.path.getsize(self.file_path)
+        offset = self.load_saved_index(size)
+        if offset == size:
+            return
+        # Дочитываем только записи, добавленные после сохранения индекса
+        with open(self.file_path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                self.add_to_index(json.loads(line), offset)
+                offset += len(line)
+        self.save_index(offset)
+
+    def fingerprint(self, size):
+        # Начало файла и последние байты до проиндексированной границы: если файл истории заменили
+        # или пересоздали, отпечаток не совпадет, даже когда новый файл не короче старого
+        digest = hashlib.sha256()
+        with open(self.file_path, 'rb') as file:
+            digest.update(file.read(min(size, HISTORY_FINGERPRINT_BYTES)))
+            file.seek(max(0, size - HISTORY_FINGERPRINT_BYTES))
+            digest.update(file.read(min(size, HISTORY_FINGERPRINT_BYTES)))
+        return digest.hexdigest()
+
+    def load_saved_index(self, size):
+        # Возвращает смещение, до которого файл истории уже проиндексирован
+        if not os.path.exists(self.index_path):
+            return 0
+        with open(self.index_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data['size'] > size or data.get('fingerprint') != self.fingerprint(data['size']):
+            return 0
+        for note_id, (revisions, offsets, keyframes) in data['notes'].items():
+            self.revisions[int(note_id)] = revisions
+            self.offsets[int(note_id)] = offsets
+            self.keyframes[int(note_id)] = keyframes
+        self.entry_count = data['entry_count']
+        return data['size']
+
+    def save_index(self, size):
+        data = {
+            'size': size,
+            'fingerprint': self.fingerprint(size),
+            'entry_count': self.entry_count,
+            'notes': {note_id: [self.revisions[note_id], self.offsets[note_id], self.keyframes[note_id]] for note_id in self.revisions}
+        }
+        with open(self.index_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+
+    def ensure_index(self):
+        if self.revisions is None:
+            self.load_index()
+
+    def add_to_index(self, entry, offset):
+        self.entry_count += 1
+        note_id = entry['note_id']
+        if entry['kind'] == 'drop':
+            self.revisions.pop(note_id, None)
+            self.offsets.pop(note_id, None)
+            self.keyframes.pop(note_id, None)
+            return
+        revisions = self.revisions.setdefault(note_id, [])
+        if entry['kind'] == 'full':
+            self.keyframes.setdefault(note_id, []).append(len(revisions))
+        revisions.append(entry['revision'])
+        self.offsets.setdefault(note_id, []).append(offset)
+
+    def append_entry(self, entry):
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        with open(self.file_path, 'ab') as file:
+            offset = file.tell()
+            file.write(line)
+        self.add_to_index(entry, offset)
+
+    def read_entry(self, file, offset):
+        file.seek(offset)
+        return json.loads(file.readline())
+
+    def revision_count(self, note_id):
+        self.ensure_index()
+        return len(self.revisions.get(note_id, []))
+
+    def record(self, note):
+        self.ensure_index()
+        revisions = self.revisions.get(note.note_id, [])
+        entry = {
+            'note_id': note.note_id,
+            'revision': revisions[-1] + 1 if revisions else 1,
+            'timestamp': note.timestamp,
+            'title': note.title
+        }
+        if not revisions or len(revisions) - self.keyframes[note.note_id][-1] >= HISTORY_KEYFRAME_INTERVAL:
+            entry['kind'] = 'full'
+            entry['content'] = note.content
+        else:
+            previous = self.get_revision(note.note_id, revisions[-1])
+            entry['kind'] = 'delta'
+            entry['ops'] = make_delta(previous['content'], note.content)
+        self.append_entry(entry)
+
+    def drop(self, note_id):
+        self.ensure_index()
+        if note_id in self.revisions:
+            self.append_entry({'note_id': note_id, 'kind': 'drop'})
+
+    def list_revisions(self, note_id):
+        self.ensure_index()
+        result = []
+        if note_id not in self.offsets:
+            return result
+        with open(self.file_path, 'rb') as file:
+            for offset in self.offsets[note_id]:
+                entry = self.read_entry(file, offset)
+                result.append({'revision': entry['revision'], 'title': entry['title'], 'timestamp': entry['timestamp']})
+        return result
+
+    def get_revision(self, note_id, revision):
+        self.ensure_index()
+        revisions = self.revisions.get(note_id, [])
+        position = bisect.bisect_left(revisions, revision)
+        if position == len(revisions) or revisions[position] != revision:
+            return None
+        # Ближайшая полная ревизия не раньше чем за HISTORY_KEYFRAME_INTERVAL шагов до искомой
+        keyframes = self.keyframes[note_id]
+        start = keyframes[bisect.bisect_right(keyframes, position) - 1]
+        offsets = self.offsets[note_id]
+        with open(self.file_path, 'rb') as file:
+            entry = self.read_entry(file, offsets[start])
+            content = entry['content']
+            for offset in offsets[start + 1:position + 1]:
+                entry = self.read_entry(file, offset)
+                content = apply_delta(content, entry['ops'])
+        return {'revision': revision, 'title': entry['title'], 'content': content, 'timestamp': entry['timestamp']}
+
+    def vacuum(self, note_ids, max_revisions=HISTORY_MAX_REVISIONS):
+        # Переписывает файл истории: удаляет историю удаленных заметок и старые ревизии сверх max_revisions
+        self.ensure_index()
+        if not os.path.exists(self.file_path):
+            return 0
+        old_count = self.entry_count
+        temp_path = self.file_path + '.tmp'
+        written = 0
+        with open(self.file_path, 'rb') as source, open(temp_path, 'wb') as target:
+            for note_id, offsets in self.offsets.items():
+                if note_id not in note_ids:
+                    continue
+                first = max(0, len(offsets) - max_revisions)
+                for position in range(first, len(offsets)):
+                    entry = self.read_entry(source, offsets[position])
+                    if position == first and entry['kind'] != 'full':
+                        kept = self.get_revision(note_id, entry['revision'])
+                        entry['kind'] = 'full'
+                        entry['content'] = kept['content']
+                        del entry['ops']
+                    target.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+                    written += 1
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.replace(temp_path, self.file_path)
+        self.load_index()
+        return old_count - written
 
 class NoteManager:
     def __init__(self):
         self.notes = []
+        self.history = NoteHistory()
+        self.tracker = ChangeTracker(NOTES_TOMBSTONES_FILE, 'note_id')
         self.load_notes()
 
     def load_notes(self):
         data = load_data(NOTES_FILE, [])
         self.notes = [Note(**note) for note in data]
+        self.indexes = {}
+        if self.tracker.load(self.notes):
+            self.save_notes()
 
     def save_notes(self):
         data = [note.__dict__ for note in self.notes]
         save_data(NOTES_FILE, data)
+        self.indexes.clear()
 
     def add_note(self, title, content):
         note_id = max([note.note_id for note in self.notes], default=0) + 1
         timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         new_note = Note(note_id, title, content, timestamp)
         self.notes.append(new_note)
+        self.tracker.touch(new_note)
         self.save_notes()
+        self.history.record(new_note)
         print('Заметка успешно добавлена')
 
-    def list_notes(self):
-        if not self.notes:
+    def iter_notes(self, sort_by=None, reverse=False, offset=0, limit=None, cursor=None):
+        return iter_query(self.notes, None, resolve_sort_key(NOTE_SORT_KEYS, sort_by), reverse, offset, limit, cursor)
+
+    def page_notes(self, limit=PAGE_SIZE, cursor=None, sort_by=None, reverse=False):
+        return fetch_page(self.notes, limit, cursor, None, resolve_sort_key(NOTE_SORT_KEYS, sort_by), reverse)
+
+    def list_notes(self, sort_by=None, reverse=False):
+        if not print_pages(self.iter_notes(sort_by, reverse), format_note):
             print('Список заметок пуст')
-            return
-        for note in self.notes:
-            print(f'{note.note_id}. {note.title} (дата: {note.timestamp})')
-        
+
     def get_note_by_id(self, note_id) -> Note:
         for note in self.notes:
             if note.note_id == note_id:
@@ -80,10 +554,17 @@ class NoteManager:
     def edit_note(self, note_id, new_title, new_content):
         note = self.get_note_by_id(note_id)
         if note:
+            if not self.history.revision_count(note_id):
+                # Заметка создана до появления истории - сохраняем исходную версию
+                self.history.record(note)
             note.title = new_title
             note.content = new_content
             note.timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.tracker.touch(note)
             self.save_notes()
+            self.history.record(note)
+            if self.history.revision_count(note_id) > 2 * HISTORY_MAX_REVISIONS:
+                self.history.vacuum({note.note_id for note in self.notes})
             print('Заметка успешно отредактирована')
         else:
             print('Заметка не найдена')
@@ -92,11 +573,37 @@ class NoteManager:
         note = self.get_note_by_id(note_id)
         if note:
             self.notes.remove(note)
+            self.tracker.remove(note_id)
             self.save_notes()
+            self.history.drop(note_id)
             print('Заметка успешно удалена')
         else:
             print('Заметка не найдена')
     
+    def show_history(self, note_id):
+        if not self.get_note_by_id(note_id):
+            print('Заметка не найдена')
+            return
+        revisions = self.history.list_revisions(note_id)
+        if not revisions:
+            print('История заметки пуста')
+            return
+        for revision in revisions:
+            print(f"Ревизия {revision['revision']}: {revision['title']} (дата: {revision['timestamp']})")
+
+    def view_revision(self, note_id, revision):
+        kept = self.history.get_revision(note_id, revision)
+        if kept:
+            print(f"Заголовок: {kept['title']}")
+            print(f"Содержимое: {kept['content']}")
+            print(f"Дата изменения: {kept['timestamp']}")
+        else:
+            print('Ревизия не найдена')
+
+    def vacuum_history(self):
+        removed = self.history.vacuum({note.note_id for note in self.notes})
+        print(f'История заметок очищена, удалено записей: {removed}')
+
     def export_notes_to_csv(self):
         if not self.notes:
             print('Список заметок пуст')
@@ -119,6 +626,7 @@ class NoteManager:
         if not os.path.exists(file_name):
             print(f'Файл {file_name} не найден')
             return
+        start = len(self.notes)
         with open(file_name, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
@@ -128,6 +636,8 @@ class NoteManager:
                 timestamp = row.get('Дата', datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
                 new_note = Note(note_id, title, content, timestamp)
                 self.notes.append(new_note)
+                self.history.record(new_note)
+            self.tracker.touch_many(self.notes[start:])
             self.save_notes()
         print(f'Заметки успешно импортированы из файла {file_name}')
 
@@ -142,7 +652,10 @@ def notes_menu():
         print('5. Удалить заметку')
         print('6. Экспорт заметок в CSV')
         print('7. Импорт заметок из CSV')
-        print('8. Назад')
+        print('8. История изменений заметки')
+        print('9. Посмотреть версию заметки')
+        print('10. Очистить историю заметок')
+        print('11. Назад')
 
         choise = int(input('Введите номер действия: '))
 
@@ -151,7 +664,8 @@ def notes_menu():
             content = input('Введите содержание заметки: ')
             manager.add_note(title, content)
         elif choise == 2:
-            manager.list_notes()
+            sort_by, reverse = ask_sort(NOTE_SORT_KEYS)
+            manager.list_notes(sort_by, reverse)
         elif choise == 3:
             try:
                 note_id = int(input('Введите ID заметки: '))
@@ -177,31 +691,275 @@ def notes_menu():
         elif choise == 7:
             manager.import_notes_from_csv()
         elif choise == 8:
+            try:
+                note_id = int(input('Введите ID заметки: '))
+                manager.show_history(note_id)
+            except ValueError:
+                print('ID заметки не корректен')
+        elif choise == 9:
+            try:
+                note_id = int(input('Введите ID заметки: '))
+                revision = int(input('Введите номер ревизии: '))
+                manager.view_revision(note_id, revision)
+            except ValueError:
+                print('ID заметки или номер ревизии не корректен')
+        elif choise == 10:
+            manager.vacuum_history()
+        elif choise == 11:
             break
         else:
             print('Неверный номер действия, попробуйте снова')
 
 class Task:
-    def __init__(self, task_id, title, description, done=False, priority="Средний", due_date=None):
+    def __init__(self, task_id, title, description, done=False, priority="Средний", due_date=None, reminded_for=None, change_seq=0, modified_at=None):
         self.task_id = task_id
         self.title = title
         self.description = description
         self.done = done
         self.priority = priority
         self.due_date = due_date
+        self.reminded_for = reminded_for
+        self.change_seq = change_seq
+        self.modified_at = modified_at
+
+TASK_PRIORITY_ORDER = {'Низкий': 0, 'Средний': 1, 'Высокий': 2}
+
+TASK_SORT_KEYS = {
+    'id': lambda task: task.task_id,
+    'title': lambda task: task.title.lower(),
+    'priority': lambda task: TASK_PRIORITY_ORDER.get(task.priority, -1),
+    'due': lambda task: date_sort_key(task.due_date),
+    'done': lambda task: task.done
+}
+
+# Столбец Parquet: (тип pyarrow, функция получения значения)
+TASKS_PARQUET_COLUMNS = {
+    'task_id': ('int64', lambda task: task.task_id),
+    'title': ('string', lambda task: task.title),
+    'description': ('string', lambda task: task.description),
+    'done': ('bool_', lambda task: bool(task.done)),
+    'priority': ('string', lambda task: task.priority),
+    'due_date': ('date32', lambda task: parse_date(task.due_date))
+}
+
+def format_task(task):
+    status = "Выполнена" if task.done else "Не выполнена"
+    due_date = task.due_date if task.due_date else "Не указано"
+    return (f"ID: {task.task_id}, Заголовок: {task.title}, Статус: {status}, Приоритет: {task.priority}, Срок: {due_date}\n"
+            f"Описание: {task.description}")
+
+def reminder_timestamp(due_date):
+    try:
+        day = datetime.datetime.strptime(due_date, '%d-%m-%Y')
+    except (TypeError, ValueError):
+        return None
+    return datetime.datetime.combine(day.date(), REMINDER_TIME).timestamp()
+
+def print_reminder(reminder):
+    task, due_date = reminder
+    print(f'Напоминание: наступил срок задачи "{task.title}" (ID: {task.task_id}, срок: {due_date})')
+
+def make_hook_reminder(command):
+    def run_hook(reminder):
+        task, due_date = reminder
+        subprocess.run(shlex.split(command) + [str(task.task_id), task.title, due_date], check=False)
+    return run_hook
+
+def default_reminder_callbacks():
+    callbacks = [print_reminder]
+    if REMINDER_HOOK:
+        callbacks.append(make_hook_reminder(REMINDER_HOOK))
+    return callbacks
+
+class SystemClock:
+    def now(self):
+        return time.time()
+
+    def wait(self, condition, timeout):
+        condition.wait(timeout)
+
+class SimulatedClock:
+    # Часы для тестов планировщика: время идет только при вызове advance()
+    def __init__(self, start=0.0):
+        self.current = start
+        self.conditions = []
+
+    def now(self):
+        return self.current
+
+    def wait(self, condition, timeout):
+        if condition not in self.conditions:
+            self.conditions.append(condition)
+        condition.wait()
+
+    def advance(self, seconds):
+        self.current += seconds
+        for condition in self.conditions:
+            with condition:
+                condition.notify_all()
+
+class ReminderScheduler:
+    def __init__(self, callbacks=None, clock=None):
+        self.callbacks = list(callbacks or [])
+        self.clock = clock or SystemClock()
+        # Куча из [время, порядковый номер, ключ, данные, активна]; отмена помечает запись,
+        # а не удаляет ее из кучи, поэтому и вставка, и отмена стоят не больше O(log N)
+        self.heap = []
+        self.entries = {}
+        self.cancelled = 0
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        # Вызывается один раз на пачку сработавших напоминаний, например чтобы сохранить отметку о них
+        self.on_fired = None
+
+    def schedule(self, key, when, payload):
+        with self.condition:
+            self.cancel_locked(key)
+            entry = [when, next(self.counter), key, payload, True]
+            self.entries[key] = entry
+            heapq.heappush(self.heap, entry)
+            if self.heap[0] is entry:
+                self.condition.notify()
+
+    def schedule_many(self, items):
+        # Массовая загрузка за O(N) вместо N вставок
+        with self.condition:
+            for key, when, payload in items:
+                self.cancel_locked(key)
+                entry = [when, next(self.counter), key, payload, True]
+                self.entries[key] = entry
+                self.heap.append(entry)
+            heapq.heapify(self.heap)
+            self.condition.notify()
+
+    def cancel(self, key):
+        with self.condition:
+            self.cancel_locked(key)
+
+    def cancel_locked(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        entry[4] = False
+        self.cancelled += 1
+        if self.cancelled > len(self.heap) // 2:
+            self.heap = [item for item in self.heap if item[4]]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+
+    def clear(self):
+        with self.condition:
+            self.heap = []
+            self.entries = {}
+            self.cancelled = 0
+
+    def pending_count(self):
+        return len(self.entries)
+
+    def run_pending(self):
+        # Вызывает обработчики для всех наступивших напоминаний и возвращает их количество
+        due = []
+        with self.condition:
+            now = self.clock.now()
+            while self.heap and self.heap[0][0] <= now:
+                entry = heapq.heappop(self.heap)
+                if entry[4]:
+                    del self.entries[entry[2]]
+                    due.append(entry[3])
+                else:
+                    self.cancelled -= 1
+        for payload in due:
+            for callback in self.callbacks:
+                try:
+                    callback(payload)
+                except Exception as e:
+                    print(f'Ошибка напоминания: {e}')
+        if due and self.on_fired is not None:
+            self.on_fired(due)
+        return len(due)
+
+    def run(self):
+        while True:
+            self.run_pending()
+            with self.condition:
+                if not self.running:
+                    return
+                if self.heap and self.heap[0][0] <= self.clock.now():
+                    continue
+                timeout = self.heap[0][0] - self.clock.now() if self.heap else None
+                self.clock.wait(self.condition, timeout)
+                if not self.running:
+                    return
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.thread = None
 
 class TaskManager:
-    def __init__(self):
+    def __init__(self, scheduler=None):
         self.tasks = []
+        self.tracker = ChangeTracker(TASKS_TOMBSTONES_FILE, 'task_id')
+        self.scheduler = scheduler or ReminderScheduler(default_reminder_callbacks())
+        self.scheduler.on_fired = self.mark_reminded
+        # Напоминания сохраняются из потока планировщика, поэтому запись файла задач идет под блокировкой
+        self.lock = threading.RLock()
         self.load_tasks()
 
     def load_tasks(self):
         data = load_data(TASKS_FILE, [])
         self.tasks = [Task(**task) for task in data]
+        self.indexes = {}
+        if self.tracker.load(self.tasks):
+            self.save_tasks()
+        reminders = []
+        for task in self.tasks:
+            when = self.reminder_due(task)
+            if when is not None:
+                reminders.append((task.task_id, when, (task, task.due_date)))
+        self.scheduler.clear()
+        self.scheduler.schedule_many(reminders)
+
+    def reminder_due(self, task):
+        # Напоминание о сроке срабатывает один раз; новый срок снова включает напоминание
+        if task.done or task.reminded_for == task.due_date:
+            return None
+        return reminder_timestamp(task.due_date)
+
+    def schedule_reminder(self, task):
+        when = self.reminder_due(task)
+        if when is None:
+            self.scheduler.cancel(task.task_id)
+        else:
+            # Вместе с задачей запоминаем срок, на который поставлено напоминание: пока обработчики
+            # выполняются, задачу могут отредактировать, и отметка не должна попасть на новый срок
+            self.scheduler.schedule(task.task_id, when, (task, task.due_date))
+
+    def mark_reminded(self, reminders):
+        with self.lock:
+            for task, due_date in reminders:
+                if task.due_date == due_date:
+                    task.reminded_for = due_date
+            self.save_tasks()
 
     def save_tasks(self):
-        data = [task.__dict__ for task in self.tasks]
-        save_data(TASKS_FILE, data)
+        with self.lock:
+            data = [task.__dict__ for task in self.tasks]
+            save_data(TASKS_FILE, data)
+            self.indexes.clear()
 
     def add_task(self, title, description, priority="Средний", due_date=None):
         valid_priorities = ['Низкий', 'Средний', 'Высокий']
@@ -216,24 +974,28 @@ class TaskManager:
         task_id = max([task.task_id for task in self.tasks], default=0) + 1
         new_task = Task(task_id, title, description, done=False, priority=priority, due_date=due_date)
         self.tasks.append(new_task)
+        self.tracker.touch(new_task)
         self.save_tasks()
+        self.schedule_reminder(new_task)
         print('Задача успешно добавлена')
 
-    def list_tasks(self):
-        if not self.tasks:
+    def iter_tasks(self, sort_by=None, reverse=False, offset=0, limit=None, cursor=None):
+        return iter_query(self.tasks, None, resolve_sort_key(TASK_SORT_KEYS, sort_by), reverse, offset, limit, cursor)
+
+    def page_tasks(self, limit=PAGE_SIZE, cursor=None, sort_by=None, reverse=False):
+        return fetch_page(self.tasks, limit, cursor, None, resolve_sort_key(TASK_SORT_KEYS, sort_by), reverse)
+
+    def list_tasks(self, sort_by=None, reverse=False):
+        if not print_pages(self.iter_tasks(sort_by, reverse), format_task):
             print("Список задач пуст.")
-            return
-        for task in self.tasks:
-            status = "Выполнена" if task.done else "Не выполнена"
-            due_date = task.due_date if task.due_date else "Не указано"
-            print(f"ID: {task.task_id}, Заголовок: {task.title}, Статус: {status}, Приоритет: {task.priority}, Срок: {due_date}")
-            print(f"Описание: {task.description}")
 
     def mark_task_done(self, task_id):
         task = self.get_task_by_id(task_id)
         if task:
             task.done = True
+            self.tracker.touch(task)
             self.save_tasks()
+            self.scheduler.cancel(task_id)
             print('Задача успешно выполнена')
         else:
             print('Задача не найдена')
@@ -251,7 +1013,9 @@ class TaskManager:
             task.description = new_description or task.description
             task.priority = new_priority or task.priority
             task.due_date = new_due_date or task.due_date
+            self.tracker.touch(task)
             self.save_tasks()
+            self.schedule_reminder(task)
             print('Задача успешно отредактирована')
         else:
             print('Задача не найдена')
@@ -260,7 +1024,9 @@ class TaskManager:
         task = self.get_task_by_id(task_id)
         if task:
             self.tasks.remove(task)
+            self.tracker.remove(task_id)
             self.save_tasks()
+            self.scheduler.cancel(task_id)
             print('Задача успешно удалена')
         else:
             print('Задача не найдена')
@@ -289,6 +1055,7 @@ class TaskManager:
         if not os.path.exists(file_name):
             print(f'Файл {file_name} не найден')
             return
+        start = len(self.tasks)
         with open(file_name, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
@@ -300,11 +1067,48 @@ class TaskManager:
                 due_date = row.get('Срок', None)
                 new_task = Task(task_id, title, description, done, priority, due_date)
                 self.tasks.append(new_task)
+                self.schedule_reminder(new_task)
+            self.tracker.touch_many(self.tasks[start:])
             self.save_tasks()
         print(f'Задачи успешно импортированы из файла {file_name}')
 
-def tasks_menu():
-    manager = TaskManager()
+    def export_tasks_to_parquet(self):
+        if not self.tasks:
+            print('Список задач пуст')
+            return
+        file_name = 'tasks.parquet'
+        try:
+            export_to_parquet(file_name, TASKS_PARQUET_COLUMNS, self.tasks)
+        except ValueError as e:
+            print(f'Ошибка экспорта: {e}')
+            return
+        print(f'Задачи успешно экспортированы в файл {file_name}')
+
+    def import_tasks_from_parquet(self):
+        file_name = input('Введите имя Parquet-файла: ')
+        if not os.path.exists(file_name):
+            print(f'Файл {file_name} не найден')
+            return
+        start = len(self.tasks)
+        task_id = max([task.task_id for task in self.tasks], default=0)
+        try:
+            for title, description, done, priority, due_date in iter_parquet_rows(
+                    file_name, ['title', 'description', 'done', 'priority', 'due_date']):
+                task_id += 1
+                new_task = Task(task_id, title or '', description or '', bool(done), priority or 'Средний', format_date(due_date))
+                self.tasks.append(new_task)
+        except ValueError as e:
+            # Файл импортируется целиком или не импортируется вовсе
+            del self.tasks[start:]
+            print(f'Ошибка импорта, задачи не добавлены: {e}')
+            return
+        for task in self.tasks[start:]:
+            self.schedule_reminder(task)
+        self.tracker.touch_many(self.tasks[start:])
+        self.save_tasks()
+        print(f'Задачи успешно импортированы из файла {file_name}')
+
+def tasks_menu(manager):
     while True:
         print('Управление задачами:')
         print('1. Добавить новую задачу')
@@ -314,7 +1118,9 @@ def tasks_menu():
         print('5. Удалить задачу')
         print('6. Экспортировать задачи в CSV')
         print('7. Импортировать задачи из CSV')
-        print('8. Назад')
+        print('8. Экспортировать задачи в Parquet')
+        print('9. Импортировать задачи из Parquet')
+        print('10. Назад')
 
         choise = int(input('Введите номер действия: '))
 
@@ -325,7 +1131,8 @@ def tasks_menu():
             due_date = input('Введите срок выполнения задачи (ДД-ММ-ГГГГ): ').strip()
             manager.add_task(title, description, priority, due_date)
         elif choise == 2:
-            manager.list_tasks()
+            sort_by, reverse = ask_sort(TASK_SORT_KEYS)
+            manager.list_tasks(sort_by, reverse)
         elif choise == 3:
             try:
                 task_id = int(input('Введите ID задачи: '))
@@ -353,47 +1160,75 @@ def tasks_menu():
         elif choise == 7:
             manager.import_tasks_from_csv()
         elif choise == 8:
+            manager.export_tasks_to_parquet()
+        elif choise == 9:
+            manager.import_tasks_from_parquet()
+        elif choise == 10:
             break
         else:
             print('Неверный номер действия, попробуйте снова')
 
 class Contact:
-    def __init__(self, contact_id, name, phone, email):
+    def __init__(self, contact_id, name, phone, email, change_seq=0, modified_at=None):
         self.contact_id = contact_id
         self.name = name
         self.phone = phone
         self.email = email
+        self.change_seq = change_seq
+        self.modified_at = modified_at
+
+CONTACT_SORT_KEYS = {
+    'id': lambda contact: contact.contact_id,
+    'name': lambda contact: contact.name.lower(),
+    'phone': lambda contact: contact.phone,
+    'email': lambda contact: contact.email.lower()
+}
+
+def format_contact(contact):
+    return f'ID: {contact.contact_id}, Имя: {contact.name}, Телефон: {contact.phone}, Электронная почта: {contact.email}'
 
 class ContactManager:
     def __init__(self):
         self.contacts = []
+        self.tracker = ChangeTracker(CONTACTS_TOMBSTONES_FILE, 'contact_id')
         self.load_contacts()
 
     def load_contacts(self):
         data = load_data(CONTACTS_FILE, [])
         self.contacts = [Contact(**contact) for contact in data]
+        self.indexes = {}
+        if self.tracker.load(self.contacts):
+            self.save_contacts()
 
     def save_contacts(self):
         data = [contact.__dict__ for contact in self.contacts]
         save_data(CONTACTS_FILE, data)
+        self.indexes.clear()
 
     def add_contact(self, name, phone, email):
         contact_id = max([contact.contact_id for contact in self.contacts], default=0) + 1
         new_contact = Contact(contact_id, name, phone, email)
         self.contacts.append(new_contact)
+        self.tracker.touch(new_contact)
         self.save_contacts()
         print('Контакт успешно добавлен')
 
-    def search_contacts(self, query):
-        results = [
-            contact for contact in self.contacts
-            if query.lower() in contact.name.lower() or query in contact.phone
-        ]
-        if results:
-            print('Результаты поиска:')
-            for contact in results:
-                print(f'ID: {contact.contact_id}, Имя: {contact.name}, Телефон: {contact.phone}, Электронная почта: {contact.email}')
-        else:
+    def iter_contacts(self, query=None, sort_by=None, reverse=False, offset=0, limit=None, cursor=None):
+        return iter_query(self.contacts, self.contact_filter(query), resolve_sort_key(CONTACT_SORT_KEYS, sort_by),
+                          reverse, offset, limit, cursor)
+
+    def page_contacts(self, query=None, limit=PAGE_SIZE, cursor=None, sort_by=None, reverse=False):
+        return fetch_page(self.contacts, limit, cursor, self.contact_filter(query),
+                          resolve_sort_key(CONTACT_SORT_KEYS, sort_by), reverse)
+
+    def contact_filter(self, query):
+        if not query:
+            return None
+        lowered = query.lower()
+        return lambda contact: lowered in contact.name.lower() or query in contact.phone
+
+    def search_contacts(self, query, sort_by=None, reverse=False):
+        if not print_pages(self.iter_contacts(query, sort_by, reverse), format_contact, header='Результаты поиска:'):
             print('Ничего не найдено')
 
     def edit_contact(self, contact_id, new_name, new_phone, new_email):
@@ -402,6 +1237,7 @@ class ContactManager:
             contact.name = new_name
             contact.phone = new_phone
             contact.email = new_email
+            self.tracker.touch(contact)
             self.save_contacts()
             print('Контакт успешно отредактирован')
         else:
@@ -411,6 +1247,7 @@ class ContactManager:
         contact = self.get_contact_by_id(contact_id)
         if contact:
             self.contacts.remove(contact)
+            self.tracker.remove(contact_id)
             self.save_contacts()
             print('Контакт успешно удален')
         else:
@@ -447,6 +1284,7 @@ class ContactManager:
         if not os.path.exists(file_name):
             print(f'Файл {file_name} не найден')
             return
+        start = len(self.contacts)
         with open(file_name, 'r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
             for row in reader:
@@ -456,6 +1294,7 @@ class ContactManager:
                 email = row['Электронная почта']
                 new_contact = Contact(contact_id, name, phone, email)
                 self.contacts.append(new_contact)
+            self.tracker.touch_many(self.contacts[start:])
             self.save_contacts()
         print(f'Контакты успешно импортированы из файла {file_name}')
 
@@ -481,7 +1320,8 @@ def contacts_menu():
             manager.add_contact(name, phone, email)
         elif choise == 2:
             query = input('Введите имя или номер телефона контакта для поиска: ')
-            manager.search_contacts(query)
+            sort_by, reverse = ask_sort(CONTACT_SORT_KEYS)
+            manager.search_contacts(query, sort_by, reverse)
         elif choise == 3:
             try:
                 contact_id = int(input('Введите ID контакта: '))
@@ -507,44 +1347,78 @@ def contacts_menu():
             print('Неверный номер действия, попробуйте снова')
 
 class FinanceRecord:
-    def __init__(self, record_id, description, amount, category, date):
+    def __init__(self, record_id, description, amount, category, date, change_seq=0, modified_at=None):
         self.record_id = record_id
         self.description = description
         self.amount = amount
         self.category = category
         self.date = date
+        self.change_seq = change_seq
+        self.modified_at = modified_at
+
+FINANCE_SORT_KEYS = {
+    'id': lambda record: record.record_id,
+    'amount': lambda record: record.amount,
+    'category': lambda record: record.category.lower(),
+    'date': lambda record: date_sort_key(record.date),
+    'description': lambda record: record.description.lower()
+}
+
+FINANCE_PARQUET_COLUMNS = {
+    'record_id': ('int64', lambda record: record.record_id),
+    'description': ('string', lambda record: record.description),
+    'amount': ('float64', lambda record: float(record.amount)),
+    'category': ('string', lambda record: record.category),
+    'date': ('date32', lambda record: parse_date(record.date))
+}
+
+def format_record(record):
+    return f'ID: {record.record_id}, Описание: {record.description}, Сумма: {record.amount}, Категория: {record.category}, Дата: {record.date}'
 
 class FinanceManager:
     def __init__(self):
         self.records = []
+        self.tracker = ChangeTracker(FINANCE_TOMBSTONES_FILE, 'record_id')
         self.load_records()
 
     def load_records(self):
         data = load_data(FINANCE_FILE, [])
         self.records = [FinanceRecord(**record) for record in data]
+        self.indexes = {}
+        if self.tracker.load(self.records):
+            self.save_records()
 
     def save_records(self):
         data = [record.__dict__ for record in self.records]
         save_data(FINANCE_FILE, data)
+        self.indexes.clear()
 
     def add_record(self, description, amount, category, date):
         record_id = max([record.record_id for record in self.records], default=0) + 1
         new_record = FinanceRecord(record_id, description, amount, category, date)
         self.records.append(new_record)
+        self.tracker.touch(new_record)
         self.save_records()
         print('Запись успешно добавлена')
     
-    def view_records(self, filter_date=None, filter_category=None):
-        filtered_records = self.records
-        if filter_date:
-            filtered_records = [record for record in filtered_records if record.date == filter_date]
-        if filter_category:
-            filtered_records = [record for record in filtered_records if record.category.lower() == filter_category.lower()]
-        if not filtered_records:
+    def iter_records(self, filter_date=None, filter_category=None, sort_by=None, reverse=False, offset=0, limit=None, cursor=None):
+        return iter_query(self.records, self.record_filter(filter_date, filter_category),
+                          resolve_sort_key(FINANCE_SORT_KEYS, sort_by), reverse, offset, limit, cursor)
+
+    def page_records(self, filter_date=None, filter_category=None, limit=PAGE_SIZE, cursor=None, sort_by=None, reverse=False):
+        return fetch_page(self.records, limit, cursor, self.record_filter(filter_date, filter_category),
+                          resolve_sort_key(FINANCE_SORT_KEYS, sort_by), reverse)
+
+    def record_filter(self, filter_date=None, filter_category=None):
+        if not filter_date and not filter_category:
+            return None
+        category = filter_category.lower() if filter_category else None
+        return lambda record: ((not filter_date or record.date == filter_date)
+                               and (not category or record.category.lower() == category))
+
+    def view_records(self, filter_date=None, filter_category=None, sort_by=None, reverse=False):
+        if not print_pages(self.iter_records(filter_date, filter_category, sort_by, reverse), format_record):
             print('Ничего не найдено')
-            return
-        for record in filtered_records:
-            print(f'ID: {record.record_id}, Описание: {record.description}, Сумма: {record.amount}, Категория: {record.category}, Дата: {record.date}')
 
     def generate_report(self, start_date, end_date):
         try:
@@ -598,6 +1472,7 @@ class FinanceManager:
             print(f'Файл {file_name} не найден')
             return
 
+        start = len(self.records)
         with open(file_name, 'r', newline='', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile)
             for row in reader:
@@ -608,10 +1483,44 @@ class FinanceManager:
                 date = row.get('Дата', '')
                 new_record = FinanceRecord(record_id, description, amount, category, date)
                 self.records.append(new_record)
+            self.tracker.touch_many(self.records[start:])
             self.save_records()
 
         print(f'Записи успешно импортированы из файла {FINANCE_FILE}')
 
+    def export_records_to_parquet(self):
+        if not self.records:
+            print('Записи не найдены')
+            return
+        file_name = 'records.parquet'
+        try:
+            export_to_parquet(file_name, FINANCE_PARQUET_COLUMNS, self.records)
+        except ValueError as e:
+            print(f'Ошибка экспорта: {e}')
+            return
+        print(f'Записи успешно экспортированы в файл {file_name}')
+
+    def import_records_from_parquet(self):
+        file_name = input('Введите имя Parquet-файла: ')
+        if not os.path.exists(file_name):
+            print(f'Файл {file_name} не найден')
+            return
+        start = len(self.records)
+        record_id = max([record.record_id for record in self.records], default=0)
+        try:
+            for description, amount, category, date in iter_parquet_rows(
+                    file_name, ['description', 'amount', 'category', 'date']):
+                record_id += 1
+                self.records.append(FinanceRecord(record_id, description or '', amount or 0.0, category or '', format_date(date) or ''))
+        except ValueError as e:
+            # Файл импортируется целиком или не импортируется вовсе
+            del self.records[start:]
+            print(f'Ошибка импорта, записи не добавлены: {e}')
+            return
+        self.tracker.touch_many(self.records[start:])
+        self.save_records()
+        print(f'Записи успешно импортированы из файла {file_name}')
+
     def calculate_balance(self):
         income = sum(record.amount for record in self.records if record.amount > 0)
         expense = sum(record.amount for record in self.records if record.amount < 0)
@@ -638,7 +1547,9 @@ def finance_menu():
         print('5. Импортировать записи из CSV')
         print('6. Рассчитать итоговый баланс')
         print('7. Группировка по категориям')
-        print('8. Назад')
+        print('8. Экспортировать записи в Parquet')
+        print('9. Импортировать записи из Parquet')
+        print('10. Назад')
 
         choise = int(input('Введите номер действия: '))
 
@@ -654,7 +1565,8 @@ def finance_menu():
         elif choise == 2:
             filter_data = input('Введите дату в формате ДД-ММ-ГГГГ: ') or None
             filter_category = input('Введите категорию: ') or None
-            manager.view_records(filter_data, filter_category)
+            sort_by, reverse = ask_sort(FINANCE_SORT_KEYS)
+            manager.view_records(filter_data, filter_category, sort_by, reverse)
         elif choise == 3:
             start_date = input('Введите начальную дату в формате ДД-ММ-ГГГГ: ')
             end_date = input('Введите конечную дату в формате ДД-ММ-ГГГГ: ')
@@ -668,10 +1580,421 @@ def finance_menu():
         elif choise == 7:    
             manager.group_by_category()
         elif choise == 8:
+            manager.export_records_to_parquet()
+        elif choise == 9:
+            manager.import_records_from_parquet()
+        elif choise == 10:
             break
         else:
             print('Неверный номер действия, попробуйте снова')
 
+QUERY_ENTITIES = {
+    'notes': {
+        'items': 'notes',
+        'fields': {'id': ('note_id', 'int'), 'title': ('title', 'str'), 'content': ('content', 'str'), 'date': ('timestamp', 'str')},
+        'indexed': ['id'],
+        'sort_keys': NOTE_SORT_KEYS,
+        'render': format_note
+    },
+    'tasks': {
+        'items': 'tasks',
+        'fields': {
+            'id': ('task_id', 'int'), 'title': ('title', 'str'), 'description': ('description', 'str'),
+            'done': ('done', 'bool'), 'priority': ('priority', 'str'), 'due': ('due_date', 'date')
+        },
+        'indexed': ['id', 'priority', 'done'],
+        'sort_keys': TASK_SORT_KEYS,
+        'render': format_task
+    },
+    'contacts': {
+        'items': 'contacts',
+        'fields': {'id': ('contact_id', 'int'), 'name': ('name', 'str'), 'phone': ('phone', 'str'), 'email': ('email', 'str')},
+        'indexed': ['id'],
+        'sort_keys': CONTACT_SORT_KEYS,
+        'render': format_contact
+    },
+    'finance': {
+        'items': 'records',
+        'fields': {
+            'id': ('record_id', 'int'), 'description': ('description', 'str'), 'amount': ('amount', 'float'),
+            'category': ('category', 'str'), 'date': ('date', 'date')
+        },
+        'indexed': ['id', 'category', 'date'],
+        'sort_keys': FINANCE_SORT_KEYS,
+        'render': format_record
+    }
+}
+
+QUERY_KEYWORDS = {'explain', 'where', 'and', 'or', 'not', 'order', 'by', 'asc', 'desc', 'limit', 'offset'}
+
+QUERY_TOKEN_RE = re.compile(r"""\s*(?:'([^']*)'|"([^"]*)"|(<=|>=|!=|=|<|>|~)|([()])|([^\s()=<>!~'"]+))""")
+
+QUERY_OPERATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '~': operator.contains
+}
+
+def tokenize_query(text):
+    text = text.strip()
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = QUERY_TOKEN_RE.match(text, position)
+        if not match:
+            raise ValueError(f'Не удалось разобрать запрос около: {text[position:]}')
+        single, double, op, paren, word = match.groups()
+        if single is not None or double is not None:
+            tokens.append(('value', single if single is not None else double))
+        elif op:
+            tokens.append(('op', op))
+        elif paren:
+            tokens.append((paren, paren))
+        elif word.lower() in QUERY_KEYWORDS:
+            tokens.append(('keyword', word.lower()))
+        else:
+            tokens.append(('word', word))
+        position = match.end()
+    return tokens
+
+class QueryParser:
+    # Запрос: [explain] <раздел> [where <условие>] [order by <поле> [asc|desc]] [limit N] [offset N]
+    def __init__(self, text):
+        self.tokens = tokenize_query(text)
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError('Неожиданный конец запроса')
+        self.position += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token = self.peek()
+        if token[0] == kind and (value is None or token[1] == value):
+            self.position += 1
+            return True
+        return False
+
+    def parse(self):
+        query = {'explain': self.accept('keyword', 'explain'), 'where': None, 'order_by': None,
+                 'descending': False, 'limit': None, 'offset': 0}
+        query['entity'] = self.parse_name('раздел')
+        if self.accept('keyword', 'where'):
+            query['where'] = self.parse_or()
+        if self.accept('keyword', 'order'):
+            if not self.accept('keyword', 'by'):
+                raise ValueError('Ожидалось order by')
+            query['order_by'] = self.parse_name('поле сортировки')
+            if self.accept('keyword', 'desc'):
+                query['descending'] = True
+            else:
+                self.accept('keyword', 'asc')
+        while self.peek() in (('keyword', 'limit'), ('keyword', 'offset')):
+            keyword = self.take()[1]
+            query[keyword] = self.parse_count(keyword)
+        if self.peek()[0] is not None:
+            raise ValueError(f'Лишний фрагмент запроса: {self.peek()[1]}')
+        return query
+
+    def parse_name(self, what):
+        kind, value = self.take()
+        if kind != 'word':
+            raise ValueError(f'Ожидалось {what}, получено: {value}')
+        return value.lower()
+
+    def parse_count(self, keyword):
+        kind, value = self.take()
+        if kind != 'word' or not value.isdigit():
+            raise ValueError(f'После {keyword} ожидалось неотрицательное целое число, получено: {value}')
+        return int(value)
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.accept('keyword', 'or'):
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.accept('keyword', 'and'):
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.accept('keyword', 'not'):
+            return ('not', self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.accept('(', '('):
+            node = self.parse_or()
+            if not self.accept(')', ')'):
+                raise ValueError('Ожидалась закрывающая скобка')
+            return node
+        field = self.parse_name('имя поля')
+        kind, op = self.peek()
+        if kind != 'op':
+            return ('field', field)
+        self.position += 1
+        kind, value = self.take()
+        if kind not in ('word', 'value'):
+            raise ValueError(f'Ожидалось значение после {field} {op}')
+        return ('compare', field, op, value)
+
+def lookup_field(fields, field):
+    if field not in fields:
+        raise ValueError(f"Неизвестное поле: {field}. Доступны: {', '.join(fields)}")
+    return fields[field]
+
+def field_getter(attribute, field_type):
+    # Строки сравниваются без учета регистра, даты - как даты, а не как строки ДД-ММ-ГГГГ
+    if field_type == 'str':
+        return lambda item: str(getattr(item, attribute) or '').casefold()
+    if field_type == 'date':
+        return lambda item: parse_date(getattr(item, attribute))
+    if field_type == 'bool':
+        return lambda item: bool(getattr(item, attribute))
+    return operator.attrgetter(attribute)
+
+def convert_query_value(field, field_type, raw):
+    if field_type in ('int', 'float'):
+        try:
+            return int(raw) if field_type == 'int' else float(raw)
+        except ValueError:
+            raise ValueError(f'Поле {field} ожидает число, получено: {raw}')
+    if field_type == 'date':
+        value = parse_date(raw)
+        if value is None:
+            raise ValueError(f'Поле {field} ожидает дату в формате ДД-ММ-ГГГГ, получено: {raw}')
+        return value
+    if field_type == 'bool':
+        if raw.lower() in ('true', 'да', '1'):
+            return True
+        if raw.lower() in ('false', 'нет', '0'):
+            return False
+        raise ValueError(f'Поле {field} ожидает true или false, получено: {raw}')
+    return raw.casefold()
+
+def compile_condition(fields, node):
+    kind = node[0]
+    if kind == 'and':
+        left = compile_condition(fields, node[1])
+        right = compile_condition(fields, node[2])
+        return lambda item: left(item) and right(item)
+    if kind == 'or':
+        left = compile_condition(fields, node[1])
+        right = compile_condition(fields, node[2])
+        return lambda item: left(item) or right(item)
+    if kind == 'not':
+        inner = compile_condition(fields, node[1])
+        return lambda item: not inner(item)
+    field = node[1]
+    attribute, field_type = lookup_field(fields, field)
+    getter = field_getter(attribute, field_type)
+    if kind == 'field':
+        if field_type != 'bool':
+            raise ValueError(f'Поле {field} не логическое, укажите условие сравнения')
+        return getter
+    op, raw = node[2], node[3]
+    if op == '~' and field_type != 'str':
+        raise ValueError('Оператор ~ применим только к текстовым полям')
+    compare = QUERY_OPERATORS[op]
+    constant = convert_query_value(field, field_type, raw)
+
+    def predicate(item):
+        value = getter(item)
+        return value is not None and compare(value, constant)
+    return predicate
+
+def condition_to_text(node):
+    kind = node[0]
+    if kind == 'and':
+        return f'{condition_to_text(node[1])} and {condition_to_text(node[2])}'
+    if kind == 'or':
+        return f'({condition_to_text(node[1])} or {condition_to_text(node[2])})'
+    if kind == 'not':
+        return f'not {condition_to_text(node[1])}'
+    if kind == 'field':
+        return node[1]
+    return f'{node[1]} {node[2]} {node[3]}'
+
+def split_conjuncts(node):
+    if node is None:
+        return []
+    if node[0] == 'and':
+        return split_conjuncts(node[1]) + split_conjuncts(node[2])
+    return [node]
+
+def join_conjuncts(nodes):
+    node = None
+    for part in nodes:
+        node = part if node is None else ('and', node, part)
+    return node
+
+class QueryPlan:
+    def __init__(self, text, managers):
+        self.query = QueryParser(text).parse()
+        name = self.query['entity']
+        if name not in QUERY_ENTITIES:
+            raise ValueError(f"Неизвестный раздел: {name}. Доступны: {', '.join(QUERY_ENTITIES)}")
+        self.entity = QUERY_ENTITIES[name]
+        manager = managers[name]
+        self.items = getattr(manager, self.entity['items'])
+        self.total = len(self.items)
+        self.sort_key = resolve_sort_key(self.entity['sort_keys'], self.query['order_by'])
+        self.render = self.entity['render']
+
+        # Одно равенство по индексируемому полю сужает выборку до корзины хеш-индекса,
+        # остальные условия проверяются уже только на ней
+        conjuncts = split_conjuncts(self.query['where'])
+        self.index_step = None
+        for node in conjuncts:
+            key = self.index_key(node)
+            if key is None:
+                continue
+            field, value = key
+            index = manager.indexes.get(field)
+            built = index is None
+            if built:
+                index = {}
+                getter = field_getter(*self.entity['fields'][field])
+                for item in self.items:
+                    index.setdefault(getter(item), []).append(item)
+                manager.indexes[field] = index
+            self.items = index.get(value, [])
+            self.index_step = (node, built)
+            conjuncts = [part for part in conjuncts if part is not node]
+            break
+        self.residual = join_conjuncts(conjuncts)
+        self.predicate = None if self.residual is None else compile_condition(self.entity['fields'], self.residual)
+
+    def index_key(self, node):
+        if node[0] == 'not' and node[1][0] == 'field':
+            field, value = node[1][1], False
+        elif node[0] == 'field':
+            field, value = node[1], True
+        elif node[0] == 'compare' and node[2] == '=':
+            field, value = node[1], None
+        else:
+            return None
+        if field not in self.entity['indexed']:
+            return None
+        attribute, field_type = lookup_field(self.entity['fields'], field)
+        if value is None:
+            value = convert_query_value(field, field_type, node[3])
+        elif field_type != 'bool':
+            return None
+        return field, value
+
+    def execute(self):
+        return iter_query(self.items, self.predicate, self.sort_key, self.query['descending'],
+                          self.query['offset'], self.query['limit'])
+
+    def explain(self):
+        lines = [f"План запроса: {self.query['entity']}"]
+        if self.index_step:
+            node, built = self.index_step
+            source = 'индекс построен' if built else 'индекс из кэша'
+            lines.append(f'Поиск по индексу: {condition_to_text(node)} - {len(self.items)} из {self.total} записей ({source})')
+        else:
+            lines.append(f'Полный проход: {self.total} записей')
+        lines.append(f'Фильтр: {condition_to_text(self.residual)}' if self.residual else 'Фильтр: нет')
+        if self.sort_key is None:
+            lines.append('Сортировка: нет, порядок хранения')
+        else:
+            direction = 'по убыванию' if self.query['descending'] else 'по возрастанию'
+            if self.query['limit'] is None:
+                method = 'полная'
+            else:
+                method = f"частичная, куча на {self.query['offset'] + self.query['limit']} элементов"
+            lines.append(f"Сортировка: {self.query['order_by']} {direction} ({method})")
+        limit = self.query['limit'] if self.query['limit'] is not None else 'нет'
+        lines.append(f"Смещение: {self.query['offset']}, лимит: {limit}")
+        return lines
+
+def query_menu(task_manager):
+    managers = {
+        'notes': NoteManager(),
+        'tasks': task_manager,
+        'contacts': ContactManager(),
+        'finance': FinanceManager()
+    }
+    print('Разделы: notes, tasks, contacts, finance. Пример: finance where amount < 0 order by amount limit 20')
+    while True:
+        text = input('Введите запрос (explain перед запросом - показать план, пустая строка - назад): ').strip()
+        if not text:
+            break
+        try:
+            plan = QueryPlan(text, managers)
+        except ValueError as e:
+            print(f'Ошибка: {e}')
+            continue
+        if plan.query['explain']:
+            for line in plan.explain():
+                print(line)
+        elif not print_pages(plan.execute(), plan.render):
+            print('Ничего не найдено')
+
+CHANGE_EXPORTS = {
+    'notes': (NoteManager, Note),
+    'tasks': (TaskManager, Task),
+    'contacts': (ContactManager, Contact),
+    'finance': (FinanceManager, FinanceRecord)
+}
+
+def change_rows(tracker, changes):
+    for change in changes:
+        if isinstance(change, dict):
+            yield {'op': 'delete', tracker.id_attr: change['id'], 'change_seq': change['change_seq'], 'modified_at': change['deleted_at']}
+        else:
+            yield {'op': 'upsert', **change.__dict__}
+
+def export_changes(since, file_format='csv', entities=None):
+    # Выгружает только объекты, измененные или удаленные после отметки since
+    managers = {name: CHANGE_EXPORTS[name][0]() for name in entities or CHANGE_EXPORTS}
+    watermark = current_change_seq()
+    for name, manager in managers.items():
+        purged = purged_change_seq(name)
+        if since < purged:
+            print(f'{name}: надгробия до отметки {purged} удалены, удаления до нее не попадут в выгрузку')
+        changes = manager.tracker.changes_since(since)
+        file_name = f'{name}_changes.{file_format}'
+        with open(file_name, 'w', newline='', encoding='utf-8') as file:
+            if file_format == 'csv':
+                fieldnames = ['op'] + list(inspect.signature(CHANGE_EXPORTS[name][1]).parameters)
+                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(change_rows(manager.tracker, changes))
+            else:
+                for row in change_rows(manager.tracker, changes):
+                    file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        print(f'{name}: изменений - {len(changes)}, файл {file_name}')
+    print(f'Отметка для следующей выгрузки: {watermark}')
+
+def purge_changes(before, entities=None):
+    # Удаляет надгробия с номером не больше before - отметки, которую все потребители уже выгрузили
+    if before > current_change_seq():
+        print(f'Ошибка: отметка {before} еще не выдана')
+        return
+    data = load_data(CHANGE_SEQUENCE_FILE, {'seq': 0})
+    purged = data.setdefault('purged', {})
+    for name in entities or CHANGE_EXPORTS:
+        count = CHANGE_EXPORTS[name][0]().tracker.purge_tombstones(before)
+        purged[name] = max(purged.get(name, 0), before)
+        print(f'{name}: удалено надгробий - {count}')
+    save_data(CHANGE_SEQUENCE_FILE, data)
+
 class Calculator:
     def __init__(self):
         pass
@@ -764,6 +2087,9 @@ def calculator_menu():
 
 
 def main_menu():
+    # Один менеджер задач на весь процесс: его планировщик присылает напоминания в любом разделе
+    task_manager = TaskManager()
+    task_manager.scheduler.start()
     while True:
         print ('Добро пожаловать в Персональный помощник!')
         print('Выберите действие:')
@@ -772,14 +2098,15 @@ def main_menu():
         print('3. Управление контактами')
         print('4. Управление финансовыми записями')
         print('5. Калькулятор')
-        print('6. Выход')
+        print('6. Выполнить запрос')
+        print('7. Выход')
 
         choise = int(input('Введите номер действия: '))
 
         if choise == 1:
             notes_menu()
         elif choise == 2:
-            tasks_menu()
+            tasks_menu(task_manager)
         elif choise == 3:
             contacts_menu()
         elif choise == 4:
@@ -787,10 +2114,28 @@ def main_menu():
         elif choise == 5:
             calculator_menu()
         elif choise == 6:
+            query_menu(task_manager)
+        elif choise == 7:
+            task_manager.scheduler.stop()
             print('До свидания!')
             break
         else:
             print('Неверный номер действия, попробуйте снова')
 
 if __name__ == '__main__':
-    main_menu()
+    parser = argparse.ArgumentParser(description='Персональный помощник')
+    subparsers = parser.add_subparsers(dest='command')
+    export_parser = subparsers.add_parser('export', help='Выгрузить изменения после отметки')
+    export_parser.add_argument('--since', type=int, default=0, help='Отметка (номер изменения) предыдущей выгрузки')
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    export_parser.add_argument('--entity', choices=list(CHANGE_EXPORTS), action='append', help='Раздел для выгрузки, по умолчанию все')
+    purge_parser = subparsers.add_parser('purge', help='Удалить надгробия удаленных объектов, уже выгруженные всеми потребителями')
+    purge_parser.add_argument('--before', type=int, required=True, help='Отметка, до которой все потребители выгрузили изменения (--since их следующей выгрузки)')
+    purge_parser.add_argument('--entity', choices=list(CHANGE_EXPORTS), action='append', help='Раздел для очистки, по умолчанию все')
+    args = parser.parse_args()
+    if args.command == 'export':
+        export_changes(args.since, args.format, args.entity)
+    elif args.command == 'purge':
+        purge_changes(args.before, args.entity)
+    else:
+        main_menu()
@@ -0,0 +1,198 @@
+import os
+import sys
+import datetime
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import personal_assistant as assistant
+
+START = datetime.datetime(2026, 1, 1).timestamp()
+DAY = 24 * 60 * 60
+
+
+def due_at(date_str):
+    return assistant.reminder_timestamp(date_str)
+
+
+class ReminderSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = assistant.SimulatedClock(START)
+        self.fired = []
+        self.scheduler = assistant.ReminderScheduler([self.fired.append], self.clock)
+
+    def test_fires_only_after_due_time(self):
+        self.scheduler.schedule('a', START + 10, 'a')
+        self.clock.advance(9)
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        self.clock.advance(1)
+        self.assertEqual(self.scheduler.run_pending(), 1)
+        self.assertEqual(self.fired, ['a'])
+        self.assertEqual(self.scheduler.pending_count(), 0)
+
+    def test_fires_in_due_order(self):
+        self.scheduler.schedule_many([('b', START + 20, 'b'), ('a', START + 10, 'a'), ('c', START + 30, 'c')])
+        self.clock.advance(25)
+        self.scheduler.run_pending()
+        self.assertEqual(self.fired, ['a', 'b'])
+
+    def test_cancel(self):
+        self.scheduler.schedule('a', START + 10, 'a')
+        self.scheduler.schedule('b', START + 10, 'b')
+        self.scheduler.cancel('a')
+        self.clock.advance(10)
+        self.scheduler.run_pending()
+        self.assertEqual(self.fired, ['b'])
+
+    def test_reschedule_replaces_previous_time(self):
+        self.scheduler.schedule('a', START + 10, 'a')
+        self.scheduler.schedule('a', START + 100, 'a')
+        self.clock.advance(50)
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        self.clock.advance(50)
+        self.assertEqual(self.scheduler.run_pending(), 1)
+
+    def test_thread_fires_after_advance(self):
+        event = threading.Event()
+        self.scheduler.callbacks.append(lambda payload: event.set())
+        self.scheduler.schedule('a', START + 10, 'a')
+        self.scheduler.start()
+        try:
+            self.assertFalse(event.wait(0.2))
+            self.clock.advance(10)
+            self.assertTrue(event.wait(2))
+        finally:
+            self.scheduler.stop()
+        self.assertEqual(self.fired, ['a'])
+
+
+class TaskManagerRemindersTest(unittest.TestCase):
+    def setUp(self):
+        self.old_cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        self.clock = assistant.SimulatedClock(START)
+        self.fired = []
+        self.manager = self.make_manager()
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        self.temp_dir.cleanup()
+
+    def make_manager(self):
+        scheduler = assistant.ReminderScheduler([lambda reminder: self.fired.append(reminder[0].task_id)], self.clock)
+        return assistant.TaskManager(scheduler)
+
+    def advance_to(self, date_str):
+        self.clock.advance(due_at(date_str) - self.clock.now())
+        return self.manager.scheduler.run_pending()
+
+    def test_add_task_schedules_reminder(self):
+        self.manager.add_task('a', '', 'Высокий', '03-01-2026')
+        self.assertEqual(self.advance_to('02-01-2026'), 0)
+        self.assertEqual(self.advance_to('03-01-2026'), 1)
+        self.assertEqual(self.fired, [1])
+
+    def test_edit_task_reschedules(self):
+        self.manager.add_task('a', '', 'Высокий', '03-01-2026')
+        self.manager.edit_task(1, new_due_date='05-01-2026')
+        self.assertEqual(self.advance_to('03-01-2026'), 0)
+        self.assertEqual(self.advance_to('05-01-2026'), 1)
+
+    def test_mark_done_and_delete_cancel(self):
+        self.manager.add_task('a', '', 'Высокий', '03-01-2026')
+        self.manager.add_task('b', '', 'Высокий', '03-01-2026')
+        self.manager.add_task('c', '', 'Высокий', '03-01-2026')
+        self.manager.mark_task_done(1)
+        self.manager.delete_task(2)
+        self.advance_to('03-01-2026')
+        self.assertEqual(self.fired, [3])
+
+    def test_fired_reminder_is_not_repeated_after_reload(self):
+        self.manager.add_task('a', '', 'Высокий', '03-01-2026')
+        self.advance_to('04-01-2026')
+        self.assertEqual(self.fired, [1])
+        self.manager = self.make_manager()
+        self.assertEqual(self.manager.scheduler.pending_count(), 0)
+        self.manager.edit_task(1, new_due_date='06-01-2026')
+        self.advance_to('06-01-2026')
+        self.assertEqual(self.fired, [1, 1])
+
+    def test_edit_during_callback_keeps_new_due_date(self):
+        self.manager.add_task('a', '', 'Высокий', '03-01-2026')
+        self.manager.scheduler.callbacks.append(lambda reminder: self.manager.edit_task(1, new_due_date='10-01-2026'))
+        self.assertEqual(self.advance_to('03-01-2026'), 1)
+        self.assertIsNone(self.manager.get_task_by_id(1).reminded_for)
+        self.manager = self.make_manager()
+        self.assertEqual(self.manager.scheduler.pending_count(), 1)
+        self.assertEqual(self.advance_to('10-01-2026'), 1)
+        self.assertEqual(self.fired, [1, 1])
+        self.assertEqual(self.manager.get_task_by_id(1).reminded_for, '10-01-2026')
+
+    def test_thread_fires_task_reminder(self):
+        event = threading.Event()
+        self.manager.scheduler.callbacks.append(lambda reminder: event.set())
+        self.manager.add_task('a', '', 'Высокий', '03-01-2026')
+        self.manager.scheduler.start()
+        try:
+            self.clock.advance(due_at('03-01-2026') - self.clock.now())
+            self.assertTrue(event.wait(2))
+        finally:
+            self.manager.scheduler.stop()
+        self.assertEqual(self.fired, [1])
+        self.assertEqual(self.manager.get_task_by_id(1).reminded_for, '03-01-2026')
+
+
+class TaskManagerRemindersThreadTest(TaskManagerRemindersTest):
+    def setUp(self):
+        self.state = threading.Condition()
+        self.busy = 0
+        self.total = 0
+        self.manager = None
+        super().setUp()
+
+    def tearDown(self):
+        self.manager.scheduler.stop()
+        super().tearDown()
+
+    def make_manager(self):
+        if self.manager is not None:
+            self.manager.scheduler.stop()
+        manager = super().make_manager()
+        run_pending = manager.scheduler.run_pending
+
+        def tracked_run_pending():
+            with self.state:
+                self.busy += 1
+            count = 0
+            try:
+                count = run_pending()
+            finally:
+                with self.state:
+                    self.busy -= 1
+                    self.total += count
+                    self.state.notify_all()
+            return count
+
+        manager.scheduler.run_pending = tracked_run_pending
+        manager.scheduler.start()
+        return manager
+
+    def has_due(self):
+        scheduler = self.manager.scheduler
+        with scheduler.condition:
+            return bool(scheduler.heap) and scheduler.heap[0][0] <= self.clock.now()
+
+    def advance_to(self, date_str):
+        with self.state:
+            before = self.total
+        self.clock.advance(due_at(date_str) - self.clock.now())
+        with self.state:
+            self.assertTrue(self.state.wait_for(lambda: not self.busy and not self.has_due(), 2))
+            return self.total - before
+
+
+if __name__ == '__main__':
+    unittest.main()